@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import ruptures as rpt
+from preprocessing_df import HourlyFeatures
 
 def detect_changepoints(
     features_df,
@@ -17,7 +18,7 @@ def detect_changepoints(
     Detect changepoints in hourly interval smart meter data using various ruptures algorithms.
 
     INPUT:
-        features_df:                      DataFrame with datetime index or 'datetime' column.
+        features_df:                      DataFrame with datetime index or 'datetime' column, or HourlyFeatures.
         method:                           Changepoint detection method. Allowed values: 'pelt', 'binseg', 'window', or 'bottomup' (default = 'pelt')
         model:                            Cost model. Allowed values: 'l1', 'l2' (default = 'l2')
         min_size_hours:                   Minimum segment length (default = 2).
@@ -31,69 +32,128 @@ def detect_changepoints(
         contrib_features_dict:            Maps each timestamp to a list of contributing features.
     """
 
-    # Ensure datetime is the index
-    if not isinstance(features_df.index, pd.DatetimeIndex):
-        if "datetime" in features_df.columns:
-            features_df = features_df.set_index("datetime")
-        else:
-            raise ValueError("DataFrame must have a datetime column or a DatetimeIndex.")
+    # All features as one contiguous (N, F) array and the datetimes as int64 nanoseconds
+    # (breakpoints stay int64 until the merged breakpoints are returned)
+    features = HourlyFeatures.from_frame(features_df)
+    values, index_ns = features.values, features.index_ns
 
     breakpoints_per_feature = {}
 
-    # Loop over each feature
-    for column in features_df.columns:
-        signal = features_df[column].dropna().values
-        if len(signal) < 2 * min_size_hours:
-            continue
-
-        # Select algorithm
-        if method == "pelt":
-            algo = rpt.Pelt(model=model, min_size=min_size_hours).fit(signal)
-            result = algo.predict(pen=penalty)[:-1]
-        elif method == "binseg":
-            algo = rpt.Binseg(model=model, min_size=min_size_hours).fit(signal)
-            result = algo.predict(pen=penalty)[:-1]
-        elif method == "window":
-            algo = rpt.Window(width=window_width, min_size=min_size_hours, model=model).fit(signal)
-            result = algo.predict(pen=penalty)[:-1]
-        elif method == "bottomup":
-            algo = rpt.BottomUp(model=model, min_size=min_size_hours).fit(signal)
-            result = algo.predict(pen=penalty)[:-1]
-        else:
-            raise ValueError(f"Unknown method: {method}. Choose from 'pelt', 'binseg', 'window', 'bottomup'.")
+    # Mask of the valid (non-NaN) values
+    valid = ~np.isnan(values)
+
+    if method == "pelt" and model == "l2":
+        # Fast path: numba L2 PELT kernel (see fast_pelt.py), each feature on its own valid (non-NaN) rows.
+        # Binseg stays on ruptures: its cumulative-sum gains can flip near-ties between candidate splits.
+        from fast_pelt import CPDContext  # imported here, so numba is only needed for this method and model
 
-        breakpoints_per_feature[column] = [features_df.index[bkp] for bkp in result]
+        row_ok = valid.all(axis=1)
+        if (valid == row_ok[:, None]).all():
+            # All features share their missing rows: run all features at once on a single slice
+            groups = [(np.arange(len(features.columns)), np.flatnonzero(row_ok))]
+        else:
+            groups = [(np.array([k]), np.flatnonzero(valid[:, k])) for k in range(len(features.columns))]
+
+        for ks, rows in groups:
+            if len(rows) < 2 * min_size_hours:
+                continue
+
+            arr = values if len(ks) == values.shape[1] and len(rows) == len(values) else values[np.ix_(rows, ks)]
+            results = CPDContext(arr).pelt(penalty, min_size=min_size_hours)
+            for k, cp in zip(ks, results):
+                breakpoints_per_feature[features.columns[k]] = index_ns[rows.take(cp)]
+    else:
+        # Loop over each feature
+        for k, column in enumerate(features.columns):
+            rows = np.flatnonzero(valid[:, k])
+            signal = values[rows, k]
+            if len(signal) < 2 * min_size_hours:
+                continue
+
+            # Select algorithm
+            if method == "pelt":
+                algo = rpt.Pelt(model=model, min_size=min_size_hours).fit(signal)
+                result = algo.predict(pen=penalty)[:-1]
+            elif method == "binseg":
+                algo = rpt.Binseg(model=model, min_size=min_size_hours).fit(signal)
+                result = algo.predict(pen=penalty)[:-1]
+            elif method == "window":
+                algo = rpt.Window(width=window_width, min_size=min_size_hours, model=model).fit(signal)
+                result = algo.predict(pen=penalty)[:-1]
+            elif method == "bottomup":
+                algo = rpt.BottomUp(model=model, min_size=min_size_hours).fit(signal)
+                result = algo.predict(pen=penalty)[:-1]
+            else:
+                raise ValueError(f"Unknown method: {method}. Choose from 'pelt', 'binseg', 'window', 'bottomup'.")
+
+            breakpoints_per_feature[column] = index_ns[rows[result]]
 
     # Merge breakpoints
-    bkp_records = [(bkp, feat) for feat, bkps in breakpoints_per_feature.items() for bkp in bkps]
-    bkp_records = sorted(bkp_records, key=lambda x: x[0])
-
-    tolerance_merge = pd.Timedelta(hours=merge_tolerance_hours)
-    aggregated_groups, used = [], [False] * len(bkp_records) # storage for (bkp, feat)-tuples that belong to the same group (breakpoints close in time)
-
-    for i in range(len(bkp_records)):
-        if used[i]: continue
-        current_group = [bkp_records[i]]
-        used[i] = True # set breakpoint to used
-        for j in range(i+1, len(bkp_records)):
-            if used[j]: continue
-            if abs(bkp_records[j][0] - bkp_records[i][0]) <= tolerance_merge:
-                current_group.append(bkp_records[j]) # append breakpoint to group if close in time.
-                used[j] = True
-        aggregated_groups.append(current_group)
-
-    # Filter and aggregate: store median breakpoint time
-    aggregated_breakpoints = []
-    contrib_features_dict = {}
-
-    for group in aggregated_groups:
-        features_in_group = list({feat for _, feat in group})
-        if len(features_in_group) >= n_contributing_features:
-            timestamps = [bkp for bkp, _ in group]
-            median_bkp = pd.Series(timestamps).median()
-            aggregated_breakpoints.append(median_bkp)
-            contrib_features_dict[median_bkp] = features_in_group
+    feature_names = list(breakpoints_per_feature)
+    if breakpoints_per_feature:
+        bkps_ns = np.concatenate(list(breakpoints_per_feature.values()))
+    else:
+        bkps_ns = np.empty(0, dtype=np.int64)
+    feature_codes = np.repeat(np.arange(len(feature_names)), [len(bkps) for bkps in breakpoints_per_feature.values()])
+
+    order = np.argsort(bkps_ns, kind="stable")
+    bkps_ns, feature_codes = bkps_ns[order], feature_codes[order]
+
+    # Groups of breakpoints close in time: each group starts at the first breakpoint not yet used
+    # and takes all breakpoints within the tolerance of that first breakpoint.
+    tolerance_ns = pd.Timedelta(hours=merge_tolerance_hours).value
+    group_starts = []
+    start = 0
+    while start < len(bkps_ns):
+        group_starts.append(start)
+        start = max(start + 1, np.searchsorted(bkps_ns, bkps_ns[start] + tolerance_ns, side="right"))
+    group_starts = np.array(group_starts, dtype=np.int64)
+    group_sizes = np.diff(np.append(group_starts, len(bkps_ns)))
+    n_groups = len(group_starts)
+    group_id = np.repeat(np.arange(n_groups), group_sizes)
+
+    # Unique contributing features per group
+    n_features = max(len(feature_names), 1)
+    pairs = np.unique(group_id * n_features + feature_codes)
+    pair_groups, pair_features = np.divmod(pairs, n_features)
+    n_contrib = np.bincount(pair_groups, minlength=n_groups)
+    features_per_group = np.split(pair_features, np.cumsum(n_contrib)[:-1])
+
+    # Filter, and take the median breakpoint time of the remaining groups: bkps_ns is sorted,
+    # so the median is (the mean of) the middle element(s) of each group
+    kept = np.flatnonzero(n_contrib >= n_contributing_features)
+    lower = bkps_ns[group_starts[kept] + (group_sizes[kept] - 1) // 2]
+    upper = bkps_ns[group_starts[kept] + group_sizes[kept] // 2]
+    median_bkps = pd.to_datetime(lower + (upper - lower) // 2, utc=True).tz_convert(features.tz)
+
+    # Aggregate: store median breakpoint time
+    aggregated_breakpoints = list(median_bkps)
+    contrib_features_dict = {
+        median_bkp: [feature_names[f] for f in features_per_group[g]]
+        for median_bkp, g in zip(aggregated_breakpoints, kept)
+    }
 
     return aggregated_breakpoints, contrib_features_dict
 
 
+def detect_changepoints_many(features_per_ean, n_jobs=-1, **kwargs):
+    """
+    Detect changepoints for multiple EANs in parallel, one EAN per worker process. Requires the optional 'joblib' package.
+
+    INPUT:
+        features_per_ean:                 Dictionary mapping each EAN_ID to its features DataFrame or HourlyFeatures (e.g. from preprocessing(df, per_ean=True)).
+        n_jobs:                           Number of worker processes (default = -1: all CPU cores).
+        **kwargs:                         Keyword arguments for detect_changepoints (method, model, penalty, ...).
+
+    OUTPUT:
+        results:                          Maps each EAN_ID to the (aggregated_breakpoints, contrib_features_dict) tuple of detect_changepoints.
+    """
+    from joblib import Parallel, delayed, parallel_config
+
+    # The EANs are the parallel dimension: one numba thread per worker avoids oversubscribing the cores
+    with parallel_config(backend="loky", inner_max_num_threads=1):
+        results = Parallel(n_jobs=n_jobs, batch_size="auto")(
+            delayed(detect_changepoints)(features_df, **kwargs) for features_df in features_per_ean.values()
+        )
+
+    return dict(zip(features_per_ean.keys(), results))
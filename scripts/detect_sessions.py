@@ -2,13 +2,32 @@ import numpy as np
 import ruptures as rpt
 import matplotlib.pyplot as plt
 import pandas as pd
+from preprocessing_df import HourlyFeatures
+
+def window_reduce(ufunc, values, lo, hi):
+    """
+    Reduce all windows values[lo[i]:hi[i]] at once.
+    
+    INPUT:
+    - ufunc: NumPy ufunc used for the reduction, e.g. np.fmin or np.fmax (which ignore NaN values, like pandas).
+    - values: 1D float array.
+    - lo, hi: Integer arrays with the start (inclusive) and end (exclusive) position of each window.
+    
+    OUTPUT:
+    - Array with the reduced value per window (NaN for empty windows).
+    """
+    padded = np.append(values, np.nan)  # so that hi == len(values) is a valid reduceat index
+    bounds = np.stack([lo, hi], axis=1).ravel()
+    reduced = ufunc.reduceat(padded, bounds)[::2]
+    reduced[hi <= lo] = np.nan
+    return reduced
 
 def detect_sessions(df, aggregated_breakpoints, contrib_features_dict, max_kw_column="max_kw", threshold=1):
     """
     Identify charging sessions by classifying aggregated changepoints into start or end.
     
     INPUT:
-    - df: DataFrame with datetime index and columns representing the load profile.
+    - df: DataFrame with datetime index and columns representing the load profile, or HourlyFeatures.
     - aggregated_breakpoints: List of aggregated changepoints (from the 'detect_changepoints' function).
     - contrib_features_dict: Dictionary with breakpoints as keys and their contributing features as values.
     - max_kw_column: The column representing the maximum load per timestamp (default is "max_kw").
@@ -20,42 +39,38 @@ def detect_sessions(df, aggregated_breakpoints, contrib_features_dict, max_kw_co
     
     sessions = []
 
-    if not isinstance(df.index, pd.DatetimeIndex):
-        if "datetime" in df.columns:
-            df = df.set_index("datetime")
-        else:
-            raise ValueError("DataFrame must have a datetime column or a DatetimeIndex.")
+    # Only the max_kw column is needed (a DataFrame may also hold non-numeric columns)
+    features = HourlyFeatures.from_frame(df, columns=[max_kw_column])
     
-    # Loop through the aggregated breakpoints
-    for i, bkp in enumerate(aggregated_breakpoints):
-        # Get the surrounding window (1 hour before and after the changepoint)
-        start_time = bkp - pd.Timedelta(hours=2)
-        end_time = bkp + pd.Timedelta(hours=2)
-        
-        # Get the max load values before and after the changepoint
-        before_load = df.loc[start_time:bkp, max_kw_column].min()
-        after_load = df.loc[bkp:end_time, max_kw_column].max()
-   
-        # Heuristic to classify changepoint as start based on load change
-        if after_load - before_load > threshold:
-            
-            # Define start of charging session:
-            session_start = bkp # breakpoint start charging
-            before_load = after_load # update before_load, because we are now in the charging session
-            
-            # Find the end changepoint (look ahead)
-            if i + 1 < len(aggregated_breakpoints):
-                next_bkp = aggregated_breakpoints[i + 1] # breakpoint end charging
-                end_time = next_bkp + pd.Timedelta(hours=2) # 2 hours after end charging
-                after_end_load = df.loc[next_bkp:end_time, max_kw_column].min() # kW use after end charging
-
-                if before_load - after_end_load > threshold:  # condition for charging session
-                    session_end = next_bkp 
-                    session_duration = session_end - session_start
-            
-                    if session_duration <= pd.Timedelta(hours=24):
-                        sessions.append((session_start, session_end))
-                    
-    return sessions
+    if len(aggregated_breakpoints) == 0:
+        return sessions
 
+    # Datetimes as int64 nanoseconds, so all windows can be looked up at once with a binary search
+    index_ns = features.index_ns
+    bkps_ns = pd.DatetimeIndex(aggregated_breakpoints).as_unit("ns").asi8
+    kw = features.column(max_kw_column).astype(np.float64)
+    window = pd.Timedelta(hours=2).value
 
+    bkp_lo = np.searchsorted(index_ns, bkps_ns, side="left")
+    bkp_hi = np.searchsorted(index_ns, bkps_ns, side="right")
+    before_lo = np.searchsorted(index_ns, bkps_ns - window, side="left")
+    after_hi = np.searchsorted(index_ns, bkps_ns + window, side="right")
+
+    # Get the load values in the surrounding window (2 hours before and after each changepoint)
+    before_load = window_reduce(np.fmin, kw, before_lo, bkp_hi)  # min load before
+    after_load = window_reduce(np.fmax, kw, bkp_lo, after_hi)    # max load after
+    after_min_load = window_reduce(np.fmin, kw, bkp_lo, after_hi) # min load after (kW use after end charging)
+
+    # Heuristic to classify changepoint as start based on load change
+    is_start = after_load[:-1] - before_load[:-1] > threshold
+
+    # The next changepoint ends the charging session if the load drops again (compared to the load in the session)
+    is_end = after_load[:-1] - after_min_load[1:] > threshold
+
+    # Sessions can last at most 24 hours
+    is_short = np.diff(bkps_ns) <= pd.Timedelta(hours=24).value
+
+    for i in np.flatnonzero(is_start & is_end & is_short):
+        sessions.append((aggregated_breakpoints[i], aggregated_breakpoints[i + 1]))
+
+    return sessions
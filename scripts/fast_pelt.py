@@ -0,0 +1,300 @@
+import numpy as np
+from numba import njit, prange, types
+
+# Only every JUMP-th sample is a candidate breakpoint (ruptures' default)
+JUMP = 5
+
+# PELT pruning constant K: C(u, v) + C(v, w) + K <= C(u, w) for all u < v < w.
+# The L2 cost is additive over splits (splitting a segment never increases its cost), so K = 0.
+PRUNE_K = 0.0
+
+# Explicit signatures: the kernels are compiled once, when the module is imported, and cached on disk (cache=True),
+# so later processes load the machine code instead of compiling it again.
+BKPS = types.int64[:]
+CHANGEPOINTS = types.Tuple((BKPS, types.int64))
+
+# Fast-math flags without 'nnan' and 'ninf': the kernels use np.inf as a sentinel, and comparisons with it
+# are undefined when LLVM may assume that no value is infinite (as with all fast-math flags enabled).
+FASTMATH = {"reassoc", "contract", "arcp"}
+
+
+@njit(CHANGEPOINTS(types.float64[:], types.float64[:], types.int64, types.float64, types.int64),
+      cache=True, fastmath=FASTMATH, boundscheck=False)
+def pelt_l2_cumsum(S, S2, min_size, pen, jump):
+    """
+    PELT with the L2 cost on precomputed cumulative sums (see pelt_l2).
+
+    INPUT:
+    - S: 1D float array of length n + 1 with S[0] = 0 and S[i + 1] = S[i] + signal[i].
+    - S2: Same as S for the squared signal.
+    - min_size, pen, jump: See pelt_l2.
+
+    OUTPUT:
+    - cp, n_cp: See pelt_l2.
+    """
+    n = S.shape[0] - 1
+
+    # F[t]: optimal (penalised) cost of signal[0:t], last[t]: last changepoint of that partition
+    F = np.full(n + 1, np.inf)
+    last = np.full(n + 1, -1, dtype=np.int64)
+    solved = np.zeros(n + 1, dtype=np.bool_)
+    F[0] = 0.0
+    solved[0] = True
+
+    admissible = np.empty(n + 2, dtype=np.int64)
+    partial = np.empty(n + 2)  # F[t] + C(t, bkp) for each admissible t
+    n_adm = 0
+
+    # Candidate segment ends: multiples of jump (at least min_size), followed by n
+    first = ((min_size + jump - 1) // jump) * jump
+    n_ends = (n - first + jump - 1) // jump if n > first else 0
+    for e in range(n_ends + 1):
+        bkp = first + e * jump if e < n_ends else n
+
+        # Add a point to the admissible set from the previous loop
+        admissible[n_adm] = ((bkp - min_size) // jump) * jump
+        n_adm += 1
+
+        best = np.inf
+        best_t = -1
+        for a in range(n_adm):
+            t = admissible[a]
+            if not solved[t]:  # no partition of 0:t exists
+                partial[a] = np.inf
+                continue
+            length = bkp - t
+            seg_sum = S[bkp] - S[t]
+            partial[a] = F[t] + S2[bkp] - S2[t] - seg_sum * seg_sum / length
+            if partial[a] < best:
+                best = partial[a]
+                best_t = t
+
+        F[bkp] = best + pen
+        last[bkp] = best_t
+        solved[bkp] = True
+
+        # Trim the admissible set in place: t can never be the last changepoint of an optimal
+        # partition beyond bkp if F[t] + C(t, bkp) + K > F[bkp] (Killick et al., 2012)
+        kept = 0
+        for a in range(n_adm):
+            if partial[a] + PRUNE_K <= F[bkp]:
+                admissible[kept] = admissible[a]
+                kept += 1
+        n_adm = kept
+
+    # Backtrack from the end of the signal (n itself is not a changepoint and is not stored)
+    n_cp = 0
+    t = last[n]
+    while t > 0:
+        n_cp += 1
+        t = last[t]
+    cp = np.empty(n_cp, dtype=np.int64)
+    t = last[n]
+    for i in range(n_cp - 1, -1, -1):
+        cp[i] = t
+        t = last[t]
+    return cp, n_cp
+
+
+@njit([CHANGEPOINTS(types.float32[:], types.int64, types.float64, types.int64),
+       CHANGEPOINTS(types.float64[:], types.int64, types.float64, types.int64)],
+      cache=True, fastmath=FASTMATH, boundscheck=False)
+def pelt_l2(signal, min_size, pen, jump):
+    """
+    PELT changepoint detection for a single 1D signal with the L2 (least squared deviation) cost.
+
+    Mirrors ruptures.Pelt(model="l2", min_size=min_size, jump=jump).fit(signal).predict(pen=pen),
+    but the segment cost is computed in O(1) from cumulative sums and the recursion is compiled by numba.
+
+    INPUT:
+    - signal: 1D float32 or float64 array without NaN values.
+    - min_size: Minimum segment length (in samples).
+    - pen: Penalty value: higher penalty reduces number of breakpoints detected.
+    - jump: Only every 'jump'-th sample is considered as a candidate breakpoint (use JUMP to match ruptures).
+
+    OUTPUT:
+    - cp: Sorted int64 array with the changepoints. Unlike ruptures, the end of the signal (len(signal)) is not included.
+    - n_cp: Number of changepoints, cp[:n_cp] are valid.
+    """
+    n = signal.shape[0]
+
+    # Cumulative sums: cost of segment [u, v) = S2[v] - S2[u] - (S[v] - S[u])**2 / (v - u)
+    # (always accumulated in float64, also for float32 signals, to avoid cancellation in the cost)
+    S = np.zeros(n + 1)
+    S2 = np.zeros(n + 1)
+    for i in range(n):
+        x = np.float64(signal[i])
+        S[i + 1] = S[i] + x
+        S2[i + 1] = S2[i] + x * x
+
+    return pelt_l2_cumsum(S, S2, min_size, pen, jump)
+
+
+@njit(types.Tuple((BKPS, BKPS))(types.float64[:, :], types.float64[:, :], types.int64, types.float64, types.int64),
+      cache=True, parallel=True, boundscheck=False)
+def pelt_l2_multi(S, S2, min_size, pen, jump):
+    """
+    Run pelt_l2_cumsum on every column of 2D cumulative sum arrays in parallel.
+
+    INPUT:
+    - S: 2D float array of shape (n_samples + 1, n_features), the column-wise cumulative sums of the signals with a leading row of zeros.
+    - S2: Same as S for the squared signals.
+    - min_size, pen, jump: See pelt_l2.
+
+    OUTPUT:
+    - flat: int64 array with the changepoints of all features concatenated (without n_samples).
+    - offsets: int64 array of length n_features + 1; the changepoints of feature k are flat[offsets[k]:offsets[k + 1]].
+    """
+    n = S.shape[0] - 1
+    n_features = S.shape[1]
+    capacity = n // jump + 1
+    buffer = np.empty((n_features, capacity), dtype=np.int64)
+    counts = np.zeros(n_features, dtype=np.int64)
+
+    for k in prange(n_features):
+        cp, n_cp = pelt_l2_cumsum(S[:, k], S2[:, k], min_size, pen, jump)
+        counts[k] = n_cp
+        buffer[k, :n_cp] = cp[:n_cp]
+
+    offsets = np.zeros(n_features + 1, dtype=np.int64)
+    for k in range(n_features):
+        offsets[k + 1] = offsets[k] + counts[k]
+    flat = np.empty(offsets[n_features], dtype=np.int64)
+    for k in range(n_features):
+        flat[offsets[k]:offsets[k + 1]] = buffer[k, :counts[k]]
+    return flat, offsets
+
+
+@njit(types.Tuple((types.int64, types.float64))(types.float64[:], types.float64[:], types.int64, types.int64,
+                                                 types.int64, types.int64),
+      cache=True, fastmath=FASTMATH, boundscheck=False)
+def best_split_l2(S, S2, start, end, min_size, jump):
+    """
+    Best single breakpoint of the segment [start:end] with the L2 cost (as ruptures.Binseg.single_bkp).
+
+    OUTPUT:
+    - bkp: Breakpoint with the largest cost reduction (-1 if the segment cannot be split).
+    - gain: The cost reduction, C(start, end) - C(start, bkp) - C(bkp, end) (0 if the segment cannot be split).
+    """
+    seg_sum = S[end] - S[start]
+    segment_cost = S2[end] - S2[start] - seg_sum * seg_sum / (end - start)
+
+    best_bkp = -1
+    best_gain = 0.0
+    for bkp in range(start, end, jump):
+        if bkp - start >= min_size and end - bkp >= min_size:
+            left_sum = S[bkp] - S[start]
+            right_sum = S[end] - S[bkp]
+            gain = (segment_cost
+                    - (S2[bkp] - S2[start] - left_sum * left_sum / (bkp - start))
+                    - (S2[end] - S2[bkp] - right_sum * right_sum / (end - bkp)))
+            if best_bkp < 0 or gain >= best_gain:  # ties: the latest breakpoint, as in ruptures
+                best_bkp = bkp
+                best_gain = gain
+    return best_bkp, best_gain
+
+
+@njit(CHANGEPOINTS(types.float64[:], types.float64[:], types.int64, types.float64, types.int64),
+      cache=True, fastmath=FASTMATH, boundscheck=False)
+def binseg_l2_cumsum(S, S2, min_size, pen, jump):
+    """
+    Binary segmentation with the L2 cost on precomputed cumulative sums.
+
+    Follows ruptures.Binseg(model="l2", min_size=min_size, jump=jump).fit(signal).predict(pen=pen), except for near-ties:
+    the gains from cumulative sums differ from ruptures' by rounding, so two candidate splits whose gains agree to
+    about 1e-14 can be ordered differently and give a different breakpoint.
+
+    INPUT:
+    - S, S2, min_size, pen, jump: See pelt_l2_cumsum.
+
+    OUTPUT:
+    - cp, n_cp: See pelt_l2 (cp is a preallocated buffer, only cp[:n_cp] is valid).
+    """
+    n = S.shape[0] - 1
+    cp = np.empty(n, dtype=np.int64)
+    n_cp = 0
+
+    # Best split per segment, by segment end (only recomputed for the two segments created by a split)
+    split_bkp = np.empty(n + 1, dtype=np.int64)
+    split_gain = np.empty(n + 1)
+    known = np.zeros(n + 1, dtype=np.bool_)
+
+    while True:
+        best_bkp = -1
+        best_gain = -np.inf
+        start = 0
+        for i in range(n_cp + 1):
+            end = cp[i] if i < n_cp else n
+            if not known[end]:
+                split_bkp[end], split_gain[end] = best_split_l2(S, S2, start, end, min_size, jump)
+                known[end] = True
+            if split_gain[end] > best_gain:
+                best_bkp = split_bkp[end]
+                best_gain = split_gain[end]
+            start = end
+
+        if best_bkp < 0 or not best_gain > pen:
+            break
+
+        # Insert the new changepoint, keeping cp sorted, and forget the best split of the segment it splits
+        i = n_cp
+        while i > 0 and cp[i - 1] > best_bkp:
+            cp[i] = cp[i - 1]
+            i -= 1
+        cp[i] = best_bkp
+        n_cp += 1
+        known[cp[i + 1] if i + 1 < n_cp else n] = False
+
+    return cp, n_cp
+
+
+class CPDContext:
+    """
+    Cumulative sums of one or more signals, computed once and shared by every changepoint detection run
+    on these signals (e.g. when calibrating the penalty), so each run only does O(1) segment cost queries.
+
+    INPUT:
+    - signal: 1D array (n_samples,) or 2D array (n_samples, n_features) without NaN values.
+      float32 signals are read as is; the cumulative sums are always float64.
+    """
+
+    def __init__(self, signal):
+        signal = np.asarray(signal)
+        if signal.dtype != np.float32:
+            signal = signal.astype(np.float64, copy=False)
+        if signal.ndim == 1:
+            signal = signal.reshape(-1, 1)
+        self.n_samples, self.n_features = signal.shape
+
+        # Cumulative sums of all features in one pass, shape (n_samples + 1, n_features)
+        zeros = np.zeros((1, self.n_features))
+        self.S = np.concatenate([zeros, signal.cumsum(axis=0, dtype=np.float64)])
+        self.S2 = np.concatenate([zeros, np.square(signal, dtype=np.float64).cumsum(axis=0)])
+
+    def _no_changepoints(self):
+        return [np.empty(0, dtype=np.int64) for _ in range(self.n_features)]
+
+    def pelt(self, pen, min_size=2, jump=JUMP):
+        """
+        OUTPUT:
+        - List with per feature a sorted int64 array of changepoints (without n_samples).
+          Empty arrays if the signal is shorter than 2 * min_size (too short to be split).
+        """
+        if self.n_samples < 2 * min_size:
+            return self._no_changepoints()
+        flat, offsets = pelt_l2_multi(self.S, self.S2, min_size, float(pen), jump)
+        return [flat[offsets[k]:offsets[k + 1]] for k in range(self.n_features)]
+
+    def binseg(self, pen, min_size=2, jump=JUMP):
+        """
+        OUTPUT:
+        - List with per feature a sorted int64 array of changepoints (without n_samples).
+          Empty arrays if the signal is shorter than 2 * min_size (too short to be split).
+        """
+        if self.n_samples < 2 * min_size:
+            return self._no_changepoints()
+        results = []
+        for k in range(self.n_features):
+            cp, n_cp = binseg_l2_cumsum(self.S[:, k], self.S2[:, k], min_size, float(pen), jump)
+            results.append(cp[:n_cp])
+        return results
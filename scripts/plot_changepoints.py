@@ -1,7 +1,11 @@
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 import pandas as pd
 import numpy as np 
 import os
+from preprocessing_df import HourlyFeatures
 
 
 def plot_changepoints(aggregated_breakpoints, contrib_features_dict, features_df):
@@ -11,19 +15,23 @@ def plot_changepoints(aggregated_breakpoints, contrib_features_dict, features_df
     INPUT:
     - aggregated_breakpoints: List of timestamps corresponding to aggregated changepoints.
     - contrib_features_dict: Dictionary mapping each changepoint to a list of contributing feature names.
-    - features_df: Original DataFrame with datetime index and feature columns.
+    - features_df: Original DataFrame with datetime index and feature columns, or HourlyFeatures.
     
     OUTPUT:
     - Time series plot with all contributing features and overlaid aggregated changepoints
         
     """
-    plt.figure(figsize=(16, 10))
+    fig, ax = plt.subplots(figsize=(16, 10))
     
     
     # Initialize colours
     line_styles = ['solid', 'dashed', 'dotted', 'dashdot']
     colors = ['black', 'dimgray', 'gray', 'darkgray']
 
+    # HourlyFeatures are converted to a DataFrame only here, for plotting
+    if isinstance(features_df, HourlyFeatures):
+        features_df = features_df.to_frame()
+
     # Ensure datetime is the index. If not, try to set it.
     if not isinstance(features_df.index, pd.DatetimeIndex):
         if "datetime" in features_df.columns:
@@ -36,23 +44,33 @@ def plot_changepoints(aggregated_breakpoints, contrib_features_dict, features_df
     # OUTPUT: alphabetically sorted list containing all unique contributing features, duplicates removed
     all_contrib_features = sorted(set(f for lst in contrib_features_dict.values() for f in lst))
 
-    # Plot each contributing feature
-    for i, feature in enumerate(all_contrib_features):
-        style = line_styles[i % len(line_styles)]
-        color = colors[i % len(colors)]
-        plt.plot(features_df.index, features_df[feature], linestyle=style, color=color,
-                 label=feature, linewidth=1.5)
-
-    # Plot vertical lines for each aggregated breakpoint
-    for agg_bkp in aggregated_breakpoints:
-        plt.axvline(x=agg_bkp, color="red", linestyle="--", linewidth=2,
-                    label="Aggregated Breakpoint" if agg_bkp == aggregated_breakpoints[0] else "")
+    # Plot all contributing features as one LineCollection (one draw call), shape (n_features, n_hours, 2)
+    styles = [line_styles[i % len(line_styles)] for i in range(len(all_contrib_features))]
+    feature_colors = [colors[i % len(colors)] for i in range(len(all_contrib_features))]
+    if all_contrib_features:
+        x = mdates.date2num(features_df.index)
+        y = features_df[all_contrib_features].to_numpy(dtype=np.float64, na_value=np.nan).T
+        segments = np.stack([np.broadcast_to(x, y.shape), y], axis=-1)
+        ax.add_collection(LineCollection(segments, colors=feature_colors, linestyles=styles, linewidths=1.5))
+        ax.autoscale_view()
+
+    # Legend entries for the features (the collection itself has a single label)
+    handles = [Line2D([], [], linestyle=style, color=color, linewidth=1.5, label=feature)
+               for feature, style, color in zip(all_contrib_features, styles, feature_colors)]
+
+    # Plot vertical lines for all aggregated breakpoints at once (spanning the full height, as axvline)
+    if aggregated_breakpoints:
+        bkp_lines = ax.vlines(mdates.date2num(pd.DatetimeIndex(aggregated_breakpoints)), 0, 1,
+                              transform=ax.get_xaxis_transform(), colors="red", linestyles="--", linewidths=2,
+                              label="Aggregated Breakpoint")
+        handles.append(bkp_lines)
     
     # Plot
-    plt.xlabel("Datetime", fontsize=14)
-    plt.ylabel("Feature Value", fontsize=14)
-    plt.title("Aggregated Breakpoints with Contributing Features", fontsize=16)
-    plt.legend(fontsize=12, loc="upper right")
-    plt.grid(alpha=0.3)
+    ax.xaxis_date()
+    ax.set_xlabel("Datetime", fontsize=14)
+    ax.set_ylabel("Feature Value", fontsize=14)
+    ax.set_title("Aggregated Breakpoints with Contributing Features", fontsize=16)
+    ax.legend(handles=handles, fontsize=12, loc="upper right")
+    ax.grid(alpha=0.3)
     plt.tight_layout()
     plt.show()
\ No newline at end of file
@@ -2,6 +2,7 @@ import numpy as np
 import ruptures as rpt
 import matplotlib.pyplot as plt
 import pandas as pd
+from preprocessing_df import HourlyFeatures
 
 def plot_changepoints_sessions(aggregated_breakpoints, contrib_features_dict, features_df, sessions):
     """
@@ -10,7 +11,7 @@ def plot_changepoints_sessions(aggregated_breakpoints, contrib_features_dict, fe
     INPUT:
     - aggregated_breakpoints: List of timestamps corresponding to aggregated changepoints.
     - contrib_features_dict: Dictionary mapping each changepoint to a list of contributing feature names.
-    - features_df: Original DataFrame with datetime index and feature columns.
+    - features_df: Original DataFrame with datetime index and feature columns, or HourlyFeatures.
     - sessions: List of tuples representing charging sessions, each containing a start and end timestamp.
     
     OUTPUT:
@@ -22,6 +23,10 @@ def plot_changepoints_sessions(aggregated_breakpoints, contrib_features_dict, fe
     line_styles = ['solid', 'dashed', 'dotted', 'dashdot']
     colors = ['black', 'dimgray', 'gray', 'darkgray']
 
+    # HourlyFeatures are converted to a DataFrame only here, for plotting
+    if isinstance(features_df, HourlyFeatures):
+        features_df = features_df.to_frame()
+
     # Ensure datetime is the index. If not, try to set it.
     if not isinstance(features_df.index, pd.DatetimeIndex):
         if "datetime" in features_df.columns:
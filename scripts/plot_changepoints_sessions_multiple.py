@@ -1,5 +1,6 @@
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
 import pandas as pd
 import numpy as np
 from datetime import timedelta
@@ -38,29 +39,49 @@ def plot_changepoints_sessions_multiple(results, month, eans_to_plot=None):
         print(f"No week-level data found for selected EANs in month {month}.")
         return
 
+    eans_sorted = sorted(eans_to_plot)
+    y_positions = {ean: len(eans_to_plot) - 1 - i for i, ean in enumerate(eans_sorted)}
+
+    # Collect all sessions of the selected EANs once: one row per (week_start, EAN, session)
+    sessions_df = pd.DataFrame(
+        [(pd.to_datetime(week_start), y_positions[ean], session[0], session[1])
+         for ean in eans_sorted
+         for week_start, week_data in results[ean][month].items()
+         for session in week_data.get("sessions", [])],
+        columns=["week_start", "y_pos", "start", "end"],
+    )
+    sessions_df["start"] = pd.to_datetime(sessions_df["start"])
+    sessions_df["end"] = pd.to_datetime(sessions_df["end"])
+    sessions_per_week = dict(tuple(sessions_df.groupby("week_start")))
+
     # Generate one plot per week
     for week_start in week_starts_sorted:
         fig, ax = plt.subplots(figsize=(14, 0.6 * len(eans_to_plot) + 2))
         week_start = pd.to_datetime(week_start)
         week_end = week_start + timedelta(days=6, hours=23, minutes=59)
 
-        for i, ean in enumerate(sorted(eans_to_plot)):
-            y_pos = len(eans_to_plot) - 1 - i
-            week_data = results[ean][month].get(week_start.date(), {})
-            for session in week_data.get("sessions", []):
-                start, end = pd.to_datetime(session[0]), pd.to_datetime(session[1])
-                duration = (end - start).total_seconds() / 3600
-                norm_duration = min(1, duration / 8)
-                color = plt.cm.Blues(0.3 + 0.7 * norm_duration)  # short = light, long = dark
-                ax.plot([start, end], [y_pos, y_pos], lw=6, solid_capstyle='round', color=color, alpha=0.8)
+        # All sessions of the week as one LineCollection, segments of shape (n_sessions, 2, 2)
+        week_sessions = sessions_per_week.get(week_start)
+        if week_sessions is not None:
+            start = mdates.date2num(week_sessions["start"])
+            end = mdates.date2num(week_sessions["end"])
+            y_pos = week_sessions["y_pos"].to_numpy(dtype=np.float64)
+            segments = np.stack([np.column_stack([start, y_pos]), np.column_stack([end, y_pos])], axis=1)
+
+            duration = (week_sessions["end"] - week_sessions["start"]).dt.total_seconds().to_numpy() / 3600
+            norm_duration = np.minimum(1, duration / 8)
+            colors = plt.cm.Blues(0.3 + 0.7 * norm_duration)  # short = light, long = dark
+            ax.add_collection(LineCollection(segments, colors=colors, linewidths=6, capstyle='round', alpha=0.8))
+            ax.autoscale_view()
 
         # Y-axis
         ax.set_yticks(range(len(eans_to_plot)))
-        ax.set_yticklabels(sorted(eans_to_plot))
+        ax.set_yticklabels(eans_sorted)
         ax.set_ylabel("EAN ID")
 
         # X-axis
-        ax.set_xlim(week_start, week_end)
+        ax.xaxis_date()
+        ax.set_xlim(mdates.date2num(week_start), mdates.date2num(week_end))
         ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b\n%H:%M'))
         ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
         plt.xticks(rotation=45)
@@ -2,13 +2,73 @@ import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np 
 import os
+from dataclasses import dataclass
 
-def preprocessing(df):
+
+@dataclass
+class HourlyFeatures:
+    """
+    Hourly features as plain arrays: normalised once, then passed through the changepoint and session detection
+    without re-indexing or re-converting a DataFrame. Convert back with to_frame() (e.g. for plotting).
+
+    - index_ns: int64 array with the hours, in nanoseconds since epoch (UTC).
+    - columns: List of feature names.
+    - values: Contiguous float array of shape (n_hours, n_features), float32 if all features are float32.
+    - tz: Time zone of the original DatetimeIndex (None for tz-naive datetimes).
+    """
+    index_ns: np.ndarray
+    columns: list
+    values: np.ndarray
+    tz: object = None
+
+    @classmethod
+    def from_frame(cls, features_df, columns=None):
+        """
+        INPUT: DataFrame with datetime index or 'datetime' column (HourlyFeatures are returned as is).
+        Only the given columns are converted if columns is a list of column names (default = None: all columns).
+        """
+        if isinstance(features_df, cls):
+            return features_df
+
+        # Ensure datetime is the index (selecting the columns first, so set_index only copies those)
+        if not isinstance(features_df.index, pd.DatetimeIndex):
+            if "datetime" in features_df.columns:
+                if columns is not None:
+                    features_df = features_df[["datetime", *columns]]
+                features_df = features_df.set_index("datetime")
+            else:
+                raise ValueError("DataFrame must have a datetime column or a DatetimeIndex.")
+        elif columns is not None:
+            features_df = features_df[list(columns)]
+
+        dtype = np.float32 if (features_df.dtypes == np.float32).all() else np.float64
+        return cls(
+            index_ns=features_df.index.as_unit("ns").asi8,
+            columns=list(features_df.columns),
+            values=np.ascontiguousarray(features_df.to_numpy(dtype=dtype, na_value=np.nan)),
+            tz=features_df.index.tz,
+        )
+
+    @property
+    def index(self):
+        index = pd.DatetimeIndex(self.index_ns.view("datetime64[ns]"), name="datetime")
+        return index if self.tz is None else index.tz_localize("UTC").tz_convert(self.tz)
+
+    def column(self, name):
+        return self.values[:, self.columns.index(name)]
+
+    def to_frame(self):
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns)
+
+
+def preprocessing(df, per_ean=False, as_arrays=False):
     
     """
     INPUT
     1. a DataFrame for a single EAN_ID containing at least the columns
     'EAN_ID', 'datetime' and 'afname_kw'. 
+    2. per_ean: if True, the DataFrame may contain multiple EAN_IDs, which are all processed in one go (default = False).
+    3. as_arrays: if True, return HourlyFeatures instead of DataFrames (default = False).
 
     We will assume no 'productie_kw' is available, such as to force the algorithm to decide based on grid withdrawals. 
     
@@ -16,21 +76,19 @@ def preprocessing(df):
     1. Preprocess the given DataFrame with metering data:  
     Convert 'datetime' to datetime format and sort by meter ('ean_id') and time ('datetime')
     2. Convert the consumption from 15-min kWh values to instantaneous kW (kW = kWh * 4).
-    3. Resample the data to hourly blocks (each block aggregating 4 intervals).
+    3. Resample the data to hourly blocks per EAN_ID (each block aggregating 4 intervals).
     4. For each hour, compute general statistics on the kWh/kW values: total, mean, min, max, range (max - min)
 
     OUTPUT
-    A new DataFrame with one row per hour and a 'datetime' column representing the hour.
+    A new DataFrame with one row per hour, a 'datetime' column representing the hour and float32 feature columns.
+    If per_ean is True: a dictionary mapping each EAN_ID to such a DataFrame.
+    If as_arrays is True: HourlyFeatures instead of DataFrames.
     
     """
     
-    # Ensure datetime is in proper format
+    # Ensure datetime is in proper format: tz-naive UTC datetime64[ns] (fast path for sorting and resampling)
     df = df.copy()
-    df["datetime"] = pd.to_datetime(df["datetime"]).dt.tz_localize(None)
-    df["year"] = df["datetime"].dt.year
-    df["moy"] = df["datetime"].dt.month
-    df["day"] = df["datetime"].dt.day
-    df["hour"] = df["datetime"].dt.hour
+    df["datetime"] = pd.to_datetime(df["datetime"], utc=True).dt.tz_convert(None).astype("datetime64[ns]")
 
     # Sort by datetime
     df = df.sort_values(by=["EAN_ID", "datetime"])
@@ -41,36 +99,69 @@ def preprocessing(df):
     df['afname_kwh'] = df['afname_kwh']
     df['afname_kw'] = df['afname_kwh'] * 4
 
-    # Resample to hourly groups (each hour aggregates 4 15-min intervals)
-    hourly_groups = df.resample('h')
-    
-    features_list = []
-    
-    for hour_dt, group in hourly_groups:
-        if group.empty:
-            continue
-
-        # Consumption values (kWh) within the hour
-        kwh = group['afname_kwh']
-        kw = group['afname_kw']
-
-        # --- General hourly statistics ---
-        total_kwh   = kwh.sum()
-        min_kw      = kw.min()
-        max_kw      = kw.max()
-        range_kw    = max_kw - min_kw
-        max_kw      = kw.max()
-
-        # --- DataFrame construction ---
-        features = {
-            'datetime': hour_dt,
-            'total_kwh': total_kwh,
-            'max_kw': max_kw,
-            'range_kw': range_kw
-        }
-        
-        features_list.append(features)
-    
-    features_df = pd.DataFrame(features_list)
-    
-    return features_df
+    # Resample to hourly groups per EAN (each hour aggregates 4 15-min intervals), only hours with data are kept
+    features_df = df.groupby(['EAN_ID', pd.Grouper(freq='h')]).agg(
+        total_kwh=('afname_kwh', 'sum'),
+        max_kw=('afname_kw', 'max'),
+        min_kw=('afname_kw', 'min'),
+    )
+
+    # --- General hourly statistics ---
+    features_df['range_kw'] = features_df['max_kw'] - features_df['min_kw']
+    features_df = features_df.drop(columns='min_kw')
+
+    # float32 is precise enough for smart meter values and halves the memory used by the features
+    features_df = features_df.astype({c: 'float32' for c in ['total_kwh', 'max_kw', 'range_kw']})
+
+    convert = HourlyFeatures.from_frame if as_arrays else pd.DataFrame.reset_index
+
+    if per_ean:
+        return {ean: convert(group.droplevel('EAN_ID')) for ean, group in features_df.groupby(level='EAN_ID')}
+
+    if features_df.index.get_level_values('EAN_ID').nunique() > 1:
+        raise ValueError("DataFrame contains multiple EAN_IDs. Use per_ean=True to process them all at once.")
+
+    return convert(features_df.droplevel('EAN_ID'))
+
+
+def preprocessing_polars(df_pl):
+
+    """
+    Same hourly features as 'preprocessing', computed with polars (multi-threaded) for all EAN_IDs at once.
+    Requires the optional 'polars' package.
+
+    INPUT
+    1. a polars DataFrame containing at least the columns 'EAN_ID', 'datetime' and 'afname_kwh',
+    for one or multiple EAN_IDs (e.g. pl.from_pandas(df)). 'datetime' can be a string or a datetime column.
+
+    OUTPUT
+    A polars DataFrame with one row per EAN_ID and hour, and the columns
+    'EAN_ID', 'datetime', 'total_kwh', 'max_kw' and 'range_kw'. Use .to_pandas() if a pandas DataFrame is needed.
+
+    """
+
+    import polars as pl
+
+    # Ensure datetime is in proper format: tz-naive UTC
+    datetime = pl.col('datetime')
+    if df_pl.schema['datetime'] == pl.String:
+        datetime = datetime.str.to_datetime(time_zone='UTC')
+    if getattr(df_pl.select(datetime).schema['datetime'], 'time_zone', None) is not None:
+        datetime = datetime.dt.convert_time_zone('UTC').dt.replace_time_zone(None)
+
+    features_pl = (
+        df_pl
+        .with_columns(datetime.cast(pl.Datetime('us')))
+        .sort(['EAN_ID', 'datetime'])
+        .with_columns((pl.col('afname_kwh') * 4).alias('afname_kw'))
+        # Resample to hourly groups per EAN (each hour aggregates 4 15-min intervals)
+        .group_by_dynamic('datetime', every='1h', group_by='EAN_ID')
+        .agg([
+            pl.col('afname_kwh').sum().alias('total_kwh'),
+            pl.col('afname_kw').max().alias('max_kw'),
+            (pl.col('afname_kw').max() - pl.col('afname_kw').min()).alias('range_kw'),
+        ])
+        .with_columns(pl.col(['total_kwh', 'max_kw', 'range_kw']).cast(pl.Float32))
+    )
+
+    return features_pl